@@ -3,137 +3,347 @@ SISTEMA DE GESTIÓN DE PEDIDOS
 Aplica: Patrón Repository, SOLID e Inyección de Dependencias
 """
 
-from abc import ABC, abstractmethod
-from dataclasses import dataclass
+import sys
+import time
+from array import array
+from operator import attrgetter, mul
+from functools import cached_property
 from datetime import datetime
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Iterable, Protocol, Sequence, Tuple
 
 # ========== MODELOS ==========
-@dataclass
+# Product y OrderItem se crean por cada línea de pedido: clases con __slots__ y un
+# __init__ mínimo, sin el __repr__/__eq__ que generaría @dataclass
 class Product:
-    id: int
-    name: str
-    price: float
-    stock: int
+    __slots__ = ("id", "name", "_price", "stock", "_price_text")
+    
+    def __init__(self, id: int, name: str, price: float, stock: int):
+        self.id = id
+        self.name = name
+        self._price = price
+        self._price_text = None
+        self.stock = stock
+    
+    @property
+    def price(self) -> float:
+        return self._price
+    
+    @price.setter
+    def price(self, price: float) -> None:
+        # Cambiar el precio descarta el texto; se vuelve a formatear al pedirlo
+        self._price = price
+        self._price_text = None
+    
+    @property
+    def price_text(self) -> str:
+        """Precio formateado; se calcula la primera vez que se pide"""
+        if self._price_text is None:
+            self._price_text = f"{self._price:.2f}"
+        return self._price_text
 
-@dataclass
 class OrderItem:
-    product: Product
-    quantity: int
+    __slots__ = ("product", "quantity", "subtotal")
     
-    @property
-    def subtotal(self) -> float:
-        return self.product.price * self.quantity
+    def __init__(self, product: Product, quantity: int):
+        self.product = product
+        self.quantity = quantity
+        # Se calcula una sola vez: el item no cambia tras crearse
+        self.subtotal = product.price * quantity
+
+_get_price = attrgetter("price")
+
+def _order_total(prices: Iterable[float], qtys: Iterable[int]) -> float:
+    """Suma de precio x cantidad con el bucle en C de map/sum"""
+    return sum(map(mul, prices, qtys), 0.0)
 
-@dataclass
+# Order guarda sus líneas en dos columnas (productos y cantidades) y expone
+# `items` como propiedad, por eso no usa @dataclass
 class Order:
-    id: Optional[int]
-    customer_name: str
-    items: List[OrderItem]
-    status: str = "pending"
-    created_at: Optional[datetime] = None
-    
-    def __post_init__(self):
-        if self.created_at is None:
-            self.created_at = datetime.now()
-        if self.items is None:
-            self.items = []
+    __slots__ = (
+        "id", "customer_name", "item_products", "item_qtys", "status",
+        "_total", "created_at_ns", "_total_text", "_items",
+    )
+    
+    def __init__(
+        self,
+        id: Optional[int],
+        customer_name: str,
+        items: Optional[List[OrderItem]] = None,
+        status: str = "pending",
+        *,
+        total: Optional[float] = None,
+        created_at_ns: Optional[int] = None,
+        item_products: Optional[List[Product]] = None,
+        item_qtys: Optional[Sequence[int]] = None,
+    ):
+        self.id = id
+        self.customer_name = customer_name
+        self.status = status
+        self.created_at_ns = time.time_ns() if created_at_ns is None else created_at_ns
+        if items is not None:
+            self._set_items(items)
+        else:
+            self.item_products = [] if item_products is None else item_products
+            self.item_qtys = () if item_qtys is None else item_qtys
+            self._items = None
+        # Total cacheado: solo se calcula si no viene ya acumulado
+        if total is None:
+            total = _order_total(map(_get_price, self.item_products), self.item_qtys)
+        self.total = total
+    
+    def __repr__(self) -> str:
+        return (
+            f"Order(id={self.id!r}, customer_name={self.customer_name!r}, "
+            f"status={self.status!r}, total={self.total!r})"
+        )
+    
+    def _set_items(self, items: List[OrderItem]) -> None:
+        self._items = list(items)
+        self.item_products = [item.product for item in self._items]
+        self.item_qtys = tuple(item.quantity for item in self._items)
+    
+    @property
+    def items(self) -> List[OrderItem]:
+        """Los OrderItem se crean la primera vez que se piden, no al crear la orden"""
+        if self._items is None:
+            self._items = [
+                OrderItem(product=product, quantity=quantity)
+                for product, quantity in zip(self.item_products, self.item_qtys)
+            ]
+        return self._items
+    
+    @items.setter
+    def items(self, items: List[OrderItem]) -> None:
+        # Reemplazar las líneas recalcula el total
+        self._set_items(items)
+        self.total = _order_total(map(_get_price, self.item_products), self.item_qtys)
     
     @property
     def total(self) -> float:
-        return sum(item.subtotal for item in self.items)
+        return self._total
+    
+    @total.setter
+    def total(self, total: float) -> None:
+        # El texto formateado se rehace solo cuando cambia el total
+        self._total = total
+        self._total_text = f"{total:.2f}"
+    
+    @property
+    def total_text(self) -> str:
+        return self._total_text
+    
+    @property
+    def created_at(self) -> datetime:
+        """Fecha de creación; el datetime solo se construye al consultarla"""
+        return datetime.fromtimestamp(self.created_at_ns / 1e9)
 
 # ========== INTERFACES (SOLID - ISP) ==========
-class IOrderRepository(ABC):
-    @abstractmethod
-    def save(self, order: Order) -> None: 
-        pass
-    
-    @abstractmethod
-    def find_by_id(self, order_id: int) -> Optional[Order]: 
-        pass
-    
-    @abstractmethod
-    def find_all(self) -> List[Order]: 
-        pass
+class IOrderRepository(Protocol):
+    def save(self, order: Order, log_buffer: Optional[List[str]] = None) -> None: ...
+    
+    def find_by_id(self, order_id: int) -> Optional[Order]: ...
+    
+    def find_all(self) -> Sequence[Order]: ...
+    
+    def snapshot(self) -> Tuple[Order, ...]: ...
 
-class IProductRepository(ABC):
-    @abstractmethod
-    def find_by_id(self, product_id: int) -> Optional[Product]: 
-        pass
-    
-    @abstractmethod
-    def find_all(self) -> List[Product]: 
-        pass
-    
-    @abstractmethod
-    def update_stock(self, product_id: int, new_stock: int) -> None: 
-        pass
+class IProductRepository(Protocol):
+    def find_by_id(self, product_id: int, log_buffer: Optional[List[str]] = None) -> Optional[Product]: ...
+    
+    def find_all(self) -> List[Product]: ...
+    
+    def snapshot(self) -> Tuple[Product, ...]: ...
+    
+    def update_stock(self, product_id: int, new_stock: int, log_buffer: Optional[List[str]] = None) -> None: ...
+    
+    def bulk_reserve(
+        self, product_ids: Sequence[int], quantities: Sequence[int], log_buffer: Optional[List[str]] = None
+    ) -> Tuple[List[Product], float]: ...
 
-class INotificationService(ABC):
-    @abstractmethod
-    def send_order_confirmation(self, order: Order) -> bool: 
-        pass
+class INotificationService(Protocol):
+    def send_order_confirmation(self, order: Order) -> bool: ...
+
+# ========== ERRORES ==========
+class BulkOrderError(ValueError):
+    """Falla de una orden dentro de un lote; `created` trae las que sí se guardaron"""
+    
+    def __init__(self, message: str, created: List[Order]):
+        super().__init__(message)
+        self.created = created
+
+# ========== LOG ==========
+def _log(message: str, log_buffer: Optional[List[str]]) -> None:
+    """Imprime el mensaje, o lo acumula si se pasa un buffer"""
+    if log_buffer is None:
+        print(message)
+    else:
+        log_buffer.append(message)
 
 # ========== REPOSITORIES (PATRÓN REPOSITORY) ==========
-class InMemoryOrderRepository(IOrderRepository):
+class InMemoryOrderRepository:
     def __init__(self):
-        self._orders: Dict[int, Order] = {}
-        self._next_id = 1
+        # Los IDs son consecutivos desde 1: la orden con ID n está en la posición n - 1
+        self._orders: List[Order] = []
     
-    def save(self, order: Order) -> None:
-        if order.id is None:
-            order.id = self._next_id
-            self._next_id += 1
-        self._orders[order.id] = order
-        print(f"💾 Orden #{order.id} guardada en repositorio")
+    def save(self, order: Order, log_buffer: Optional[List[str]] = None) -> None:
+        if order.id is None or order.id == len(self._orders) + 1:
+            order.id = len(self._orders) + 1
+            self._orders.append(order)
+        elif 0 < order.id <= len(self._orders):
+            self._orders[order.id - 1] = order
+        else:
+            raise ValueError(
+                f" ID de orden inválido: {order.id}. "
+                f"Debe estar entre 1 y {len(self._orders) + 1}"
+            )
+        _log(f"💾 Orden #{order.id} guardada en repositorio", log_buffer)
     
     def find_by_id(self, order_id: int) -> Optional[Order]:
-        return self._orders.get(order_id)
+        if 0 < order_id <= len(self._orders):
+            return self._orders[order_id - 1]
+        return None
+    
+    def find_all(self) -> Sequence[Order]:
+        """Devuelve el almacén sin copiarlo; solo para recorrerlo"""
+        return self._orders
     
-    def find_all(self) -> List[Order]:
-        return list(self._orders.values())
+    def snapshot(self) -> Tuple[Order, ...]:
+        """Copia inmutable de las órdenes actuales"""
+        return tuple(self._orders)
 
-class InMemoryProductRepository(IProductRepository):
+class InMemoryProductRepository:
     def __init__(self):
-        self._products: Dict[int, Product] = {
-            1: Product(id=1, name="Laptop Gaming", price=1200.00, stock=5),
-            2: Product(id=2, name="Mouse Inalámbrico", price=45.99, stock=20),
-            3: Product(id=3, name="Teclado Mecánico", price=89.99, stock=15),
-            4: Product(id=4, name="Monitor 24'", price=299.99, stock=8),
-        }
-    
-    def find_by_id(self, product_id: int) -> Optional[Product]:
-        product = self._products.get(product_id)
-        if product:
-            print(f"Producto encontrado: {product.name}")
+        catalog = [
+            (1, "Laptop Gaming", 1200.00, 5),
+            (2, "Mouse Inalámbrico", 45.99, 20),
+            (3, "Teclado Mecánico", 89.99, 15),
+            (4, "Monitor 24'", 299.99, 8),
+        ]
+        # Catálogo en columnas: cada producto ocupa la misma posición en todos los arreglos
+        self._index: Dict[int, int] = {}
+        self._ids = array("q")
+        self._names: List[str] = []
+        self._prices = array("d")
+        self._stocks = array("q")
+        for product_id, name, price, stock in catalog:
+            self._index[product_id] = len(self._ids)
+            self._ids.append(product_id)
+            self._names.append(name)
+            self._prices.append(price)
+            self._stocks.append(stock)
+    
+    def _product_at(self, i: int) -> Product:
+        return Product(id=self._ids[i], name=self._names[i], price=self._prices[i], stock=self._stocks[i])
+    
+    def find_by_id(self, product_id: int, log_buffer: Optional[List[str]] = None) -> Optional[Product]:
+        i = self._index.get(product_id)
+        if i is None:
+            return None
+        product = self._product_at(i)
+        _log(f"Producto encontrado: {product.name}", log_buffer)
         return product
     
     def find_all(self) -> List[Product]:
-        return list(self._products.values())
+        """Los productos se construyen desde las columnas, así que siempre es una lista nueva"""
+        return [self._product_at(i) for i in range(len(self._ids))]
+    
+    def snapshot(self) -> Tuple[Product, ...]:
+        """Copia inmutable del catálogo actual"""
+        return tuple(self.find_all())
     
-    def update_stock(self, product_id: int, new_stock: int) -> None:
-        if product_id in self._products:
-            old_stock = self._products[product_id].stock
-            self._products[product_id].stock = new_stock
-            print(f"Stock actualizado: Producto {product_id} - {old_stock} → {new_stock}")
+    def update_stock(self, product_id: int, new_stock: int, log_buffer: Optional[List[str]] = None) -> None:
+        i = self._index.get(product_id)
+        if i is not None:
+            old_stock = self._stocks[i]
+            self._stocks[i] = new_stock
+            _log(f"Stock actualizado: Producto {product_id} - {old_stock} → {new_stock}", log_buffer)
+    
+    def bulk_reserve(
+        self, product_ids: Sequence[int], quantities: Sequence[int], log_buffer: Optional[List[str]] = None
+    ) -> Tuple[List[Product], float]:
+        """Valida y descuenta el stock de varios productos de una vez (todo o nada).
+        
+        Búsqueda, validación, descuento y total se hacen en una sola pasada
+        directamente sobre las columnas del catálogo.
+        """
+        if len(product_ids) != len(quantities):
+            raise ValueError(
+                f" Se recibieron {len(product_ids)} productos y {len(quantities)} cantidades"
+            )
+        
+        index, names, prices, stocks = self._index, self._names, self._prices, self._stocks
+        reserved: List[Tuple[int, int]] = []
+        products: List[Product] = []
+        # Mensajes por línea en el mismo orden que antes: encontrado, añadido, stock
+        messages: List[str] = []
+        found: List[str] = []
+        total = 0.0
+        
+        try:
+            for product_id, quantity in zip(product_ids, quantities, strict=True):
+                i = index.get(product_id)
+                if i is None:
+                    raise ValueError(f" Producto con ID {product_id} no encontrado")
+                
+                found_message = f"Producto encontrado: {names[i]}"
+                found.append(found_message)
+                messages.append(found_message)
+                
+                # El stock se guarda en un array('q'): solo admite cantidades enteras
+                if not isinstance(quantity, int):
+                    raise ValueError(f" Cantidad inválida para {names[i]}: {quantity!r}")
+                
+                stock = stocks[i]
+                if stock < quantity:
+                    raise ValueError(
+                        f" Stock insuficiente para {names[i]}. "
+                        f"Disponible: {stock}, Solicitado: {quantity}"
+                    )
+                
+                stocks[i] = stock - quantity
+                reserved.append((i, quantity))
+                total += prices[i] * quantity
+                products.append(Product(id=product_id, name=names[i], price=prices[i], stock=stock - quantity))
+                messages.append(f"   Añadido: {quantity}x {names[i]} - ${prices[i] * quantity:.2f}")
+                messages.append(f"Stock actualizado: Producto {product_id} - {stock} → {stock - quantity}")
+        except BaseException:
+            # Devolver lo ya reservado antes de propagar cualquier error; como el stock
+            # no cambia, solo se informan los productos que sí se encontraron
+            for i, quantity in reserved:
+                stocks[i] += quantity
+            for message in found:
+                _log(message, log_buffer)
+            raise
+        
+        for message in messages:
+            _log(message, log_buffer)
+        
+        return products, total
 
 # ========== SERVICES (SOLID - OCP) ==========
-class EmailNotificationService(INotificationService):
+EMAIL_TEMPLATE = (
+    "\n EMAIL DE CONFIRMACIÓN\n"
+    "   Para: {name}\n"
+    "   Asunto: Confirmación de Pedido #{id}\n"
+    "   Total: ${total}\n"
+    "   Estado: {status}\n"
+    "   ¡Gracias por tu compra!"
+)
+
+SMS_TEMPLATE = (
+    "\n📱 SMS DE CONFIRMACIÓN\n"
+    "   Para: {name}\n"
+    "   Mensaje: Pedido #{id} confirmado. Total: ${total}"
+)
+
+class EmailNotificationService:
     def send_order_confirmation(self, order: Order) -> bool:
-        print(f"\n EMAIL DE CONFIRMACIÓN")
-        print(f"   Para: {order.customer_name}")
-        print(f"   Asunto: Confirmación de Pedido #{order.id}")
-        print(f"   Total: ${order.total:.2f}")
-        print(f"   Estado: {order.status}")
-        print(f"   ¡Gracias por tu compra!")
+        print(EMAIL_TEMPLATE.format(name=order.customer_name, id=order.id, total=order.total_text, status=order.status))
         return True
 
-class SMSNotificationService(INotificationService):
+class SMSNotificationService:
     def send_order_confirmation(self, order: Order) -> bool:
-        print(f"\n📱 SMS DE CONFIRMACIÓN")
-        print(f"   Para: {order.customer_name}")
-        print(f"   Mensaje: Pedido #{order.id} confirmado. Total: ${order.total:.2f}")
+        print(SMS_TEMPLATE.format(name=order.customer_name, id=order.id, total=order.total_text))
         return True
 
 # ========== ORDER SERVICE (INYECCIÓN DE DEPENDENCIAS) ==========
@@ -152,40 +362,83 @@ class OrderService:
     
     def create_order(self, customer_name: str, items: List[tuple]) -> Order:
         """Crea una nueva orden (SOLID - SRP)"""
-        print(f"\n Creando orden para: {customer_name}")
+        product_ids = [product_id for product_id, _ in items]
+        quantities = [quantity for _, quantity in items]
+        return self.create_order_bulk(customer_name, product_ids, quantities)
+    
+    def create_order_bulk(self, customer_name: str, product_ids: Sequence[int], quantities: Sequence[int]) -> Order:
+        """Crea una orden a partir de columnas de IDs y cantidades (importaciones masivas)"""
+        # Los mensajes se acumulan y se escriben de una vez al final
+        log_buffer: List[str] = []
         
-        order_items = []
+        try:
+            order = self._place_order(customer_name, product_ids, quantities, log_buffer)
+        finally:
+            if log_buffer:
+                sys.stdout.write("\n".join(log_buffer) + "\n")
         
-        # Validar productos y stock
-        for product_id, quantity in items:
-            product = self.product_repository.find_by_id(product_id)
-            if not product:
-                raise ValueError(f" Producto con ID {product_id} no encontrado")
-            
-            if product.stock < quantity:
-                raise ValueError(
-                    f" Stock insuficiente para {product.name}. "
-                    f"Disponible: {product.stock}, Solicitado: {quantity}"
-                )
-            
-            # Crear item de orden
-            order_item = OrderItem(product=product, quantity=quantity)
-            order_items.append(order_item)
-            
-            print(f"   Añadido: {quantity}x {product.name} - ${order_item.subtotal:.2f}")
-            
-            # Actualizar stock
-            new_stock = product.stock - quantity
-            self.product_repository.update_stock(product_id, new_stock)
+        # Enviar notificación
+        self.notification_service.send_order_confirmation(order)
         
-        # Crear orden
-        order = Order(id=None, customer_name=customer_name, items=order_items)
+        return order
+    
+    def create_orders_bulk(self, orders: List[dict]) -> List[Order]:
+        """Crea varias órdenes seguidas; cada dict trae 'customer_name' e 'items'.
         
-        # Guardar en repositorio
-        self.order_repository.save(order)
+        Si una orden falla, las anteriores quedan guardadas y notificadas y se lanza
+        BulkOrderError con ellas en `created`.
+        """
+        # Se lee todo el lote antes de tocar el stock: un dict mal formado falla sin efectos
+        batch = []
+        for data in orders:
+            items = data["items"]
+            batch.append((
+                data["customer_name"],
+                [product_id for product_id, _ in items],
+                [quantity for _, quantity in items],
+            ))
         
-        # Enviar notificación
-        self.notification_service.send_order_confirmation(order)
+        log_buffer: List[str] = []
+        created: List[Order] = []
+        error: Optional[ValueError] = None
+        
+        try:
+            for customer_name, product_ids, quantities in batch:
+                created.append(self._place_order(customer_name, product_ids, quantities, log_buffer))
+        except ValueError as exc:
+            error = exc
+        
+        # Un solo volcado para todo el lote
+        if log_buffer:
+            sys.stdout.write("\n".join(log_buffer) + "\n")
+        
+        # Las órdenes ya guardadas se notifican aunque otra del lote falle
+        for order in created:
+            self.notification_service.send_order_confirmation(order)
+        
+        if error is not None:
+            raise BulkOrderError(str(error), created) from error
+        
+        return created
+    
+    def _place_order(
+        self, customer_name: str, product_ids: Sequence[int], quantities: Sequence[int], log_buffer: List[str]
+    ) -> Order:
+        """Reserva stock, construye y guarda la orden, sin notificar"""
+        log_buffer.append(f"\n Creando orden para: {customer_name}")
+        
+        # Validar productos y reservar stock en una sola llamada
+        products, total = self.product_repository.bulk_reserve(product_ids, quantities, log_buffer)
+        
+        # Crear orden: los OrderItem se materializan solo si alguien accede a order.items.
+        # Las cantidades se copian para no compartir la lista del llamador.
+        order = Order(
+            id=None, customer_name=customer_name,
+            item_products=products, item_qtys=tuple(quantities), total=total
+        )
+        
+        # Guardar en repositorio
+        self.order_repository.save(order, log_buffer)
         
         return order
     
@@ -196,7 +449,7 @@ class OrderService:
             raise ValueError(f" Orden con ID {order_id} no encontrada")
         return order
     
-    def list_orders(self) -> List[Order]:
+    def list_orders(self) -> Sequence[Order]:
         """Lista todas las órdenes"""
         return self.order_repository.find_all()
     
@@ -210,25 +463,41 @@ class DependencyContainer:
     
     def __init__(self, notification_type: str = "email"):
         self.notification_type = notification_type
+        # Un notificador y un OrderService por tipo de notificación; todos comparten los repositorios
+        self._notifier_cache: Dict[str, INotificationService] = {}
+        self._service_cache: Dict[str, OrderService] = {}
     
-    def get_order_repository(self) -> IOrderRepository:
+    # Cada repositorio se crea una sola vez y se reutiliza (singleton por contenedor)
+    @cached_property
+    def order_repository(self) -> IOrderRepository:
         return InMemoryOrderRepository()
     
-    def get_product_repository(self) -> IProductRepository:
+    @cached_property
+    def product_repository(self) -> IProductRepository:
         return InMemoryProductRepository()
     
-    def get_notification_service(self) -> INotificationService:
+    @property
+    def notification_service(self) -> INotificationService:
+        notifier = self._notifier_cache.get(self.notification_type)
+        if notifier is None:
+            notifier = self._notifier_cache[self.notification_type] = self._create_notification_service()
+        return notifier
+    
+    def _create_notification_service(self) -> INotificationService:
         if self.notification_type == "sms":
             return SMSNotificationService()
         else:
             return EmailNotificationService()
     
     def get_order_service(self) -> OrderService:
-        return OrderService(
-            order_repository=self.get_order_repository(),
-            product_repository=self.get_product_repository(),
-            notification_service=self.get_notification_service()
-        )
+        service = self._service_cache.get(self.notification_type)
+        if service is None:
+            service = self._service_cache[self.notification_type] = OrderService(
+                order_repository=self.order_repository,
+                product_repository=self.product_repository,
+                notification_service=self.notification_service
+            )
+        return service
 
 # ========== EJECUCIÓN PRINCIPAL ==========
 def main():
@@ -246,7 +515,7 @@ def main():
     products = order_service.get_available_products()
     for i, product in enumerate(products, 1):
         print(f"   {product.id}. {product.name}")
-        print(f"      Precio: ${product.price:.2f} | Stock: {product.stock}")
+        print(f"      Precio: ${product.price_text} | Stock: {product.stock}")
     
     # Demo 1: Orden exitosa
     print("\n" + "="*50)
@@ -263,7 +532,7 @@ def main():
         print(f"   Número de orden: #{order1.id}")
         print(f"   Cliente: {order1.customer_name}")
         print(f"   Productos: {len(order1.items)}")
-        print(f"   Total: ${order1.total:.2f}")
+        print(f"   Total: ${order1.total_text}")
         
     except Exception as e:
         print(f" Error en orden 1: {e}")
@@ -289,7 +558,7 @@ def main():
     orders = order_service.list_orders()
     if orders:
         for order in orders:
-            print(f"   Orden #{order.id}: {order.customer_name} - ${order.total:.2f} - {order.status}")
+            print(f"   Orden #{order.id}: {order.customer_name} - ${order.total_text} - {order.status}")
     else:
         print("   No hay órdenes registradas")
     